@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 import os
+import sys
 import subprocess
 import time
 import datetime
@@ -10,6 +11,26 @@ import yaml
 import concurrent.futures
 import platform
 import json
+import tempfile
+from statistics import fmean
+import mmap
+import errno
+import threading
+import functools
+import atexit
+import itertools
+import collections
+import ctypes
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 class Colors:
     HEADER = '\033[95m'
@@ -20,15 +41,36 @@ class Colors:
     FAIL = '\033[91m'
     ENDC = '\033[0m'
 
+_USE_COLOR = sys.stdout.isatty() and os.environ.get('NO_COLOR') is None
+
+def c(code, s):
+    return f"{code}{s}{Colors.ENDC}" if _USE_COLOR else s
+
+_INV_MIB = 1.0 / (1024 * 1024)
+_UNITS = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+_DD_SPEED_RE = re.compile(r',\s*([\d\.]+)\s*([KMGT]?B/s)')
+
 def parse_size(size_str):
-    match = re.match(r'^(\d+\.?\d*)([KkMmGgTt]?)[Bb]?$', size_str)
-    if not match:
+    num = size_str[:-1] if size_str.endswith('\n') else size_str
+    if num.endswith(('B', 'b')):
+        num = num[:-1]
+    unit = ''
+    if num and num[-1].upper() in 'KMGT':
+        unit = num[-1].upper()
+        num = num[:-1]
+    if num.startswith('.') or not num.replace('.', '', 1).isdecimal():
         raise ValueError(f"Invalid size string: {size_str}")
-    num, unit = match.groups()
-    num = float(num)
-    unit = unit.upper()
-    units = {'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
-    return int(num * units.get(unit, 1))
+    return int(float(num) * _UNITS[unit])
+
+_ZERO_BUF = None
+_ZERO_BUF_LOCK = threading.Lock()
+
+def _zero_buffer(size):
+    global _ZERO_BUF
+    with _ZERO_BUF_LOCK:
+        if _ZERO_BUF is None or len(_ZERO_BUF) < size:
+            _ZERO_BUF = mmap.mmap(-1, size, mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+        return memoryview(_ZERO_BUF)[:size]
 
 def bytes_to_readable(num_bytes):
     for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -37,73 +79,337 @@ def bytes_to_readable(num_bytes):
         num_bytes /= 1024
     return f"{num_bytes:.2f} PB"
 
-def test_file(file_index, run_dir, size_str, syncmode=None, debug=False):
-    file_path = os.path.join(run_dir, f"testfile_{file_index}.dat")
-    result = {"index": file_index, "write_time": None, "read_time": None, "error": None}
-    write_cmd = ['dd', 'if=/dev/zero', f'of={file_path}', f'bs={size_str}', 'count=1']
-    if syncmode == 'sync':
-        write_cmd.append('oflag=sync')
-    elif syncmode == 'dsync':
-        write_cmd.append('oflag=dsync')
-    elif syncmode == 'direct':
-        write_cmd.append('oflag=direct')
-    start = time.monotonic()
+try:
+    _LIBC = ctypes.CDLL(None, use_errno=True)
+    _fallocate = getattr(_LIBC, 'fallocate64', None) or _LIBC.fallocate
+    _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    _fallocate.restype = ctypes.c_int
+except (OSError, AttributeError):
+    _fallocate = None
+
+def _preallocate(fd, nbytes):
+    if _fallocate is None:
+        return
+    if _fallocate(fd, 0, 0, nbytes) != 0:
+        err = ctypes.get_errno()
+        if err not in (errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL):
+            raise OSError(err, os.strerror(err))
+
+def _write_file(file_path, bytes_per_file, syncmode):
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    if syncmode == 'direct':
+        flags |= os.O_DIRECT
+    fd = os.open(file_path, flags, 0o644)
     try:
-        if debug:
-            subprocess.run(write_cmd, check=True)
-        else:
-            subprocess.run(write_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except subprocess.CalledProcessError as e:
-        result["error"] = f"Error writing {file_path}: {e}"
-        return result
-    end = time.monotonic()
-    result["write_time"] = end - start
-    if syncmode in ['sync', 'dsync']:
+        _preallocate(fd, bytes_per_file)
+        view = _zero_buffer(bytes_per_file)
+        while view:
+            written = os.writev(fd, [view])
+            view = view[written:]
+        if syncmode == 'sync':
+            os.fsync(fd)
+        elif syncmode == 'dsync':
+            os.fdatasync(fd)
+    finally:
+        os.close(fd)
+
+def _evict_file(file_path):
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+_READ_CHUNK = 1024**2
+_NULL_FD = os.open(os.devnull, os.O_WRONLY)
+atexit.register(os.close, _NULL_FD)
+
+_DD_PATH = shutil.which('dd')
+
+def _spawn_dd(argv, stdout_fd=None, stderr_fd=None):
+    if _DD_PATH is None:
+        raise FileNotFoundError(errno.ENOENT, "dd not found in PATH", argv[0])
+    file_actions = []
+    if stdout_fd is not None:
+        file_actions.append((os.POSIX_SPAWN_DUP2, stdout_fd, 1))
+    if stderr_fd is not None:
+        file_actions.append((os.POSIX_SPAWN_DUP2, stderr_fd, 2))
+    pid = os.posix_spawn(_DD_PATH, argv, os.environ, file_actions=file_actions)
+    _, status = os.waitpid(pid, 0)
+    returncode = os.waitstatus_to_exitcode(status)
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, argv)
+
+def _run_dd(argv, debug=False):
+    if debug:
+        _spawn_dd(argv)
+    else:
+        _spawn_dd(argv, _NULL_FD, _NULL_FD)
+
+def _open_uncached(file_path):
+    try:
+        fd = os.open(file_path, os.O_RDONLY | os.O_DIRECT)
+    except OSError as e:
+        if e.errno != errno.EINVAL:
+            raise
+        fd = os.open(file_path, os.O_RDONLY)
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    return fd
+
+def _read_file(file_path, bytes_per_file):
+    size = -(-min(bytes_per_file, _READ_CHUNK) // mmap.PAGESIZE) * mmap.PAGESIZE
+    buf = mmap.mmap(-1, size, mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+    try:
+        fd = _open_uncached(file_path)
+        try:
+            while os.readv(fd, [buf]):
+                pass
+        finally:
+            os.close(fd)
+    finally:
+        buf.close()
+
+def test_file(file_index, file_path, size_str, bytes_per_file, syncmode=None, debug=False, legacy_dd=False, barrier=None):
+    result = {"index": file_index, "write_time": None, "read_time": None, "error": None}
+    if barrier is not None:
+        barrier.wait()
+    if not legacy_dd:
+        start = time.monotonic()
+        try:
+            _write_file(file_path, bytes_per_file, syncmode)
+        except OSError as e:
+            result["error"] = f"Error writing {file_path}: {e}"
+            return result
+        end = time.monotonic()
+        result["write_time"] = end - start
+        _evict_file(file_path)
+    else:
+        write_cmd = ['dd', 'if=/dev/zero', f'of={file_path}', f'bs={size_str}', 'count=1', 'conv=notrunc']
+        if syncmode == 'sync':
+            write_cmd.append('oflag=sync')
+        elif syncmode == 'dsync':
+            write_cmd.append('oflag=dsync')
+        elif syncmode == 'direct':
+            write_cmd.append('oflag=direct')
+        start = time.monotonic()
+        try:
+            fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                _preallocate(fd, bytes_per_file)
+            finally:
+                os.close(fd)
+            _run_dd(write_cmd, debug)
+        except (OSError, subprocess.CalledProcessError) as e:
+            result["error"] = f"Error writing {file_path}: {e}"
+            return result
+        end = time.monotonic()
+        result["write_time"] = end - start
+    if syncmode in ['sync', 'dsync'] and not legacy_dd:
+        start = time.monotonic()
+        try:
+            _read_file(file_path, bytes_per_file)
+        except OSError as e:
+            result["error"] = f"Error reading {file_path}: {e}"
+            return result
+        end = time.monotonic()
+        result["read_time"] = end - start
+    elif syncmode in ['sync', 'dsync']:
         read_cmd = ['dd', f'if={file_path}', 'of=/dev/null', f'bs={size_str}', 'count=1']
+        if bytes_per_file % mmap.PAGESIZE == 0:
+            read_cmd.append('iflag=direct')
         start = time.monotonic()
         try:
-            if debug:
-                subprocess.run(read_cmd, check=True)
-            else:
-                subprocess.run(read_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except subprocess.CalledProcessError as e:
+            if bytes_per_file % mmap.PAGESIZE:
+                fd = os.open(file_path, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                finally:
+                    os.close(fd)
+            _run_dd(read_cmd, debug)
+        except (OSError, subprocess.CalledProcessError) as e:
             result["error"] = f"Error reading {file_path}: {e}"
             return result
         end = time.monotonic()
         result["read_time"] = end - start
     return result
 
-def run_test_run(run_number, files, size_str, run_dir, syncmode, bytes_per_file, debug):
-    print(f"{Colors.OKBLUE}Starting test run {run_number}...{Colors.ENDC}")
+_IO_URING_MAX_OP = 0x7ffff000
+
+def _io_uring_batch(ring, cqes, fds, buf, nbytes, prep, results, key, action, depth, align=1):
+    done = dict.fromkeys(fds, 0)
+    started = {}
+    queue = collections.deque(fds)
+    inflight = 0
+    while queue or inflight:
+        if queue and inflight < depth:
+            while queue and inflight < depth:
+                index = queue.popleft()
+                length = min(-(-(nbytes - done[index]) // align) * align, len(buf), _IO_URING_MAX_OP)
+                sqe = liburing.io_uring_get_sqe(ring)
+                prep(sqe, fds[index], buf, length, done[index])
+                sqe.user_data = index
+                started.setdefault(index, time.monotonic_ns())
+                inflight += 1
+            liburing.io_uring_submit(ring)
+        liburing.io_uring_wait_cqe(ring, cqes)
+        cqe = cqes[0]
+        index = cqe.user_data
+        res = cqe.res
+        liburing.io_uring_cqe_seen(ring, cqe)
+        inflight -= 1
+        result = results[index]
+        if res < 0:
+            result["error"] = f"Error {action} {result['path']}: {os.strerror(-res)}"
+        elif res == 0:
+            result["error"] = f"Error {action} {result['path']}: no progress after {done[index]} of {nbytes} bytes"
+        else:
+            done[index] += res
+            if done[index] < nbytes:
+                queue.append(index)
+            else:
+                result[key] = (time.monotonic_ns() - started[index]) / 1e9
+
+def _io_uring_usable():
+    if liburing is None:
+        return False
+    ring = liburing.io_uring()
+    try:
+        liburing.io_uring_queue_init(1, ring, 0)
+    except OSError as e:
+        print(c(Colors.WARNING, f"io_uring is unavailable ({e}). Falling back to threaded writes."))
+        return False
+    liburing.io_uring_queue_exit(ring)
+    return True
+
+def _submit_io_uring_batch(file_paths, bytes_per_file, syncmode, depth):
+    write_flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    if syncmode == 'sync':
+        write_flags |= os.O_SYNC
+    elif syncmode == 'dsync':
+        write_flags |= os.O_DSYNC
+    elif syncmode == 'direct':
+        write_flags |= os.O_DIRECT
+    results = {}
+    for i, file_path in enumerate(file_paths, 1):
+        results[i] = {"index": i, "path": file_path, "write_time": None, "read_time": None, "error": None}
+    buf = _zero_buffer(bytes_per_file)
+    ring = liburing.io_uring()
+    cqes = liburing.io_uring_cqes()
+    liburing.io_uring_queue_init(depth, ring, 0)
+    fds = {}
+    read_buf = None
+    try:
+        for i, result in results.items():
+            try:
+                fd = os.open(result["path"], write_flags, 0o644)
+            except OSError as e:
+                result["error"] = f"Error writing {result['path']}: {e}"
+                continue
+            try:
+                _preallocate(fd, bytes_per_file)
+            except OSError as e:
+                os.close(fd)
+                result["error"] = f"Error writing {result['path']}: {e}"
+                continue
+            fds[i] = fd
+        _io_uring_batch(ring, cqes, fds, buf, bytes_per_file, liburing.io_uring_prep_write,
+                        results, "write_time", "writing", depth)
+        for fd in fds.values():
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            os.close(fd)
+        fds = {}
+        if syncmode in ['sync', 'dsync']:
+            read_buf = mmap.mmap(-1, -(-min(bytes_per_file, _READ_CHUNK) // mmap.PAGESIZE) * mmap.PAGESIZE,
+                                 mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+            for i, result in results.items():
+                if result["error"] is None:
+                    try:
+                        fds[i] = _open_uncached(result["path"])
+                    except OSError as e:
+                        result["error"] = f"Error reading {result['path']}: {e}"
+            _io_uring_batch(ring, cqes, fds, read_buf, bytes_per_file, liburing.io_uring_prep_read,
+                            results, "read_time", "reading", depth, mmap.PAGESIZE)
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+        liburing.io_uring_queue_exit(ring)
+        if read_buf is not None:
+            read_buf.close()
+    return list(results.values())
+
+def _detect_optimal_concurrency(test_path):
+    cpus = min(os.cpu_count() or 1, 16)
+    try:
+        dev = os.stat(test_path).st_dev
+        sys_dev = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+        for queue in ("queue", "../queue"):
+            rotational = os.path.join(sys_dev, queue, "rotational")
+            if os.path.exists(rotational):
+                with open(rotational, 'r') as f:
+                    return 4 if f.read().strip() == '1' else cpus
+    except OSError:
+        pass
+    return cpus
+
+def drop_caches(drop_page_cache):
+    os.sync()
+    if drop_page_cache:
+        try:
+            with open('/proc/sys/vm/drop_caches', 'w') as f:
+                f.write('3\n')
+        except OSError as e:
+            print(c(Colors.WARNING, f"Could not drop page cache: {e}"))
+
+_PIN_COUNTER = itertools.count()
+
+def _pin_worker(cpus):
+    os.sched_setaffinity(0, {cpus[next(_PIN_COUNTER) % len(cpus)]})
+
+def run_test_run(run_number, files, size_str, run_dir, syncmode, bytes_per_file, debug, executor, workers, legacy_dd=False, use_io_uring=False):
+    print(c(Colors.OKBLUE, f"Starting test run {run_number}..."))
     os.makedirs(run_dir, exist_ok=True)
-    start_run = time.monotonic()
+    file_paths = [os.path.join(run_dir, f"testfile_{i}.dat") for i in range(1, files + 1)]
+    if not legacy_dd:
+        _zero_buffer(bytes_per_file)
     results = []
-    total_written_speeds = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=files) as executor:
-        futures = [executor.submit(test_file, i, run_dir, size_str, syncmode, debug) for i in range(1, files + 1)]
+    start_run = time.monotonic()
+    if use_io_uring:
+        results = _submit_io_uring_batch(file_paths, bytes_per_file, syncmode, workers)
+    else:
+        start_times = []
+        barrier = threading.Barrier(workers, action=lambda: start_times.append(time.monotonic()))
+        futures = [executor.submit(test_file, i, file_path, size_str, bytes_per_file, syncmode, debug, legacy_dd,
+                                   barrier if i <= workers else None)
+                   for i, file_path in enumerate(file_paths, 1)]
         for future in concurrent.futures.as_completed(futures):
-            result = future.result()
-            results.append(result)
-            if result["write_time"] is not None:
-                write_speed = bytes_per_file / result["write_time"] / (1024**2)
-                total_written_speeds.append(write_speed)
+            results.append(future.result())
+        start_run = start_times[0]
     end_run = time.monotonic()
+    total_written_speeds = []
+    mib_per_file = bytes_per_file * _INV_MIB
+    for result in results:
+        if result["write_time"] is not None:
+            write_speed = mib_per_file / result["write_time"]
+            total_written_speeds.append(write_speed)
     run_duration = end_run - start_run
     total_bytes_expected = files * bytes_per_file
-    overall_write_speed = total_bytes_expected / run_duration / (1024**2)
-    average_written_speed = sum(total_written_speeds) / len(total_written_speeds) if total_written_speeds else 0
+    overall_write_speed = total_bytes_expected * _INV_MIB / run_duration
+    average_written_speed = fmean(total_written_speeds) if total_written_speeds else 0.0
     files_successful = sum(1 for res in results if res["write_time"] is not None)
     data_written = files_successful * bytes_per_file
-    print(f"{Colors.OKGREEN}Test run {run_number} completed in {run_duration:.2f} s{Colors.ENDC}")
-    print(f"{Colors.OKGREEN}Overall write speed: {overall_write_speed:.2f} MB/s{Colors.ENDC}")
-    print(f"{Colors.OKGREEN}Average file write speed: {average_written_speed:.2f} MB/s{Colors.ENDC}")
-    print(f"{Colors.OKGREEN}Successful files: {files_successful} / {files}{Colors.ENDC}")
-    print(f"{Colors.OKGREEN}Data written: {bytes_to_readable(data_written)} (Expected: {bytes_to_readable(total_bytes_expected)}){Colors.ENDC}")
+    print(c(Colors.OKGREEN, f"Test run {run_number} completed in {run_duration:.2f} s"))
+    print(c(Colors.OKGREEN, f"Overall write speed: {overall_write_speed:.2f} MB/s"))
+    print(c(Colors.OKGREEN, f"Average file write speed: {average_written_speed:.2f} MB/s"))
+    print(c(Colors.OKGREEN, f"Successful files: {files_successful} / {files}"))
+    print(c(Colors.OKGREEN, f"Data written: {bytes_to_readable(data_written)} (Expected: {bytes_to_readable(total_bytes_expected)})"))
     errors = [res["error"] for res in results if res["error"]]
     if errors:
-        print(f"{Colors.FAIL}Errors encountered:{Colors.ENDC}")
+        print(c(Colors.FAIL, "Errors encountered:"))
         for err in errors:
-            print(f"  - {Colors.WARNING}{err}{Colors.ENDC}")
+            print(f"  - {c(Colors.WARNING, err)}")
     print()
     return {
         'run': run_number,
@@ -135,10 +441,10 @@ def print_summary_table(run_results, overall_stats):
               f"{'Data':<{col8}}"
               f"{'Errors':<{col9}}")
     separator = "-" * (col1 + col2 + col3 + col4 + col5 + col6 + col7 + col8 + col9)
-    print(Colors.HEADER + "\nSummary of test runs:" + Colors.ENDC)
-    print(Colors.HEADER + separator + Colors.ENDC)
-    print(Colors.HEADER + header + Colors.ENDC)
-    print(Colors.HEADER + separator + Colors.ENDC)
+    print(c(Colors.HEADER, "\nSummary of test runs:"))
+    print(c(Colors.HEADER, separator))
+    print(c(Colors.HEADER, header))
+    print(c(Colors.HEADER, separator))
     for res in run_results:
         data_readable = bytes_to_readable(res['data_written_bytes'])
         success = f"{res['files_successful']} / {overall_stats['files_per_run']}"
@@ -152,7 +458,7 @@ def print_summary_table(run_results, overall_stats):
                 f"{data_readable:<{col8}}"
                 f"{res['error_count']:<{col9}}")
         print(line)
-    print(Colors.HEADER + separator + Colors.ENDC)
+    print(c(Colors.HEADER, separator))
     total_success = f"{overall_stats['total_files_successful']} / {overall_stats['total_files']}"
     total_line = (f"{'Total':<{col1}}"
                   f"{overall_stats['file_size']:<{col2}}"
@@ -163,8 +469,8 @@ def print_summary_table(run_results, overall_stats):
                   f"{total_success:<{col7}}"
                   f"{overall_stats['total_data_written']:<{col8}}"
                   f"{overall_stats['total_error_count']:<{col9}}")
-    print(Colors.HEADER + total_line + Colors.ENDC)
-    print(Colors.HEADER + separator + Colors.ENDC)
+    print(c(Colors.HEADER, total_line))
+    print(c(Colors.HEADER, separator))
 
 def format_speed(raw):
     try:
@@ -188,47 +494,81 @@ def format_iops(raw):
     else:
         return f"{int(value)}"
 
-def run_fio_test_for_bs(bs, fio_size, test_file, fio_cmd="fio"):
-    jobname = f"rand_rw_{bs}"
-    cmd = [
-        fio_cmd,
-        f"--name={jobname}",
-        "--ioengine=libaio",
-        "--rw=randrw",
-        "--rwmixread=50",
-        f"--bs={bs}",
-        "--iodepth=64",
-        "--numjobs=2",
-        f"--size={fio_size}",
-        "--runtime=30",
-        "--gtod_reduce=1",
-        "--direct=1",
-        f"--filename={test_file}",
-        "--group_reporting",
-        "--output-format=json"
-    ]
+_TERSE_JOBNAME = 2
+_TERSE_READ_BW = 6
+_TERSE_READ_IOPS = 7
+_TERSE_WRITE_BW = 53
+_TERSE_WRITE_IOPS = 54
+
+def _parse_fio_output(stdout):
+    if stdout.lstrip().startswith(b'{'):
+        data = orjson.loads(stdout) if orjson is not None else json.loads(stdout)
+        return [(job["jobname"], job["read"]["bw"], job["read"]["iops"], job["write"]["bw"], job["write"]["iops"])
+                for job in data["jobs"]]
+    jobs = []
+    for line in stdout.decode().splitlines():
+        fields = line.split(';')
+        if fields[0] != '5' or len(fields) <= _TERSE_WRITE_IOPS:
+            continue
+        jobs.append((fields[_TERSE_JOBNAME],
+                     int(fields[_TERSE_READ_BW]),
+                     int(fields[_TERSE_READ_IOPS]),
+                     int(fields[_TERSE_WRITE_BW]),
+                     int(fields[_TERSE_WRITE_IOPS])))
+    if not jobs:
+        raise ValueError("No terse version 5 results in fio output")
+    return jobs
+
+def run_fio_tests(block_sizes, fio_size, test_file, fio_cmd="fio"):
+    jobfile = tempfile.NamedTemporaryFile('w', prefix="hddbench_", suffix=".fio", delete=False)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=35, check=True)
-        data = json.loads(result.stdout)
-        job = data["jobs"][0]
-        read_bw = job["read"]["bw"]
-        read_iops = job["read"]["iops"]
-        write_bw = job["write"]["bw"]
-        write_iops = job["write"]["iops"]
-        total_bw = read_bw + write_bw
-        total_iops = read_iops + write_iops
-        return {
-            "bs": bs,
-            "read_bw": read_bw,
-            "read_iops": read_iops,
-            "write_bw": write_bw,
-            "write_iops": write_iops,
-            "total_bw": total_bw,
-            "total_iops": total_iops
-        }
+        with jobfile as f:
+            f.write("[global]\n"
+                    "ioengine=libaio\n"
+                    "rw=randrw\n"
+                    "rwmixread=50\n"
+                    "iodepth=64\n"
+                    "numjobs=2\n"
+                    f"size={fio_size}\n"
+                    "runtime=30\n"
+                    "gtod_reduce=1\n"
+                    "direct=1\n"
+                    "fallocate=none\n"
+                    f"filename={test_file}\n"
+                    "group_reporting\n")
+            cpus = sorted(os.sched_getaffinity(0))
+            if len(cpus) > 1:
+                f.write(f"gtod_cpu={cpus[0]}\n"
+                        f"cpus_allowed={','.join(str(cpu) for cpu in cpus[1:])}\n")
+            for bs in block_sizes:
+                f.write(f"\n[rand_rw_{bs}]\n"
+                        "stonewall\n"
+                        f"bs={bs}\n")
+        cmd = [fio_cmd, jobfile.name, "--output-format=terse", "--terse-version=5"]
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=_NULL_FD,
+                                timeout=35 * len(block_sizes), check=True)
+        results = []
+        for jobname, read_bw, read_iops, write_bw, write_iops in _parse_fio_output(result.stdout):
+            total_bw = read_bw + write_bw
+            total_iops = read_iops + write_iops
+            results.append({
+                "bs": jobname[len("rand_rw_"):],
+                "read_bw": read_bw,
+                "read_iops": read_iops,
+                "write_bw": write_bw,
+                "write_iops": write_iops,
+                "total_bw": total_bw,
+                "total_iops": total_iops
+            })
+        return results
     except Exception as e:
-        print(f"{Colors.FAIL}Fio test for block size {bs} failed: {e}{Colors.ENDC}")
-        return None
+        print(c(Colors.FAIL, f"Fio test for block sizes {', '.join(block_sizes)} failed: {e}"))
+        return []
+    finally:
+        try:
+            os.remove(jobfile.name)
+        except OSError:
+            pass
 
 def run_dd_test(disk_dir):
     test_filename = os.path.join(disk_dir, f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.test")
@@ -238,7 +578,7 @@ def run_dd_test(disk_dir):
         write_cmd = ["dd", "if=/dev/zero", f"of={test_filename}", "bs=64k", "count=16k", "oflag=direct"]
         try:
             proc = subprocess.run(write_cmd, capture_output=True, text=True, check=True)
-            m = re.search(r',\s*([\d\.]+)\s*([KMGT]?B/s)', proc.stderr)
+            m = _DD_SPEED_RE.search(proc.stderr)
             if m:
                 val, unit = m.groups()
                 speed = float(val)
@@ -246,11 +586,11 @@ def run_dd_test(disk_dir):
                     speed *= 1000
                 write_speeds.append(speed)
         except Exception as e:
-            print(f"{Colors.FAIL}dd write test failed: {e}{Colors.ENDC}")
+            print(c(Colors.FAIL, f"dd write test failed: {e}"))
         read_cmd = ["dd", f"if={test_filename}", "of=/dev/null", "bs=8k"]
         try:
             proc = subprocess.run(read_cmd, capture_output=True, text=True, check=True)
-            m = re.search(r',\s*([\d\.]+)\s*([KMGT]?B/s)', proc.stderr)
+            m = _DD_SPEED_RE.search(proc.stderr)
             if m:
                 val, unit = m.groups()
                 speed = float(val)
@@ -258,25 +598,29 @@ def run_dd_test(disk_dir):
                     speed *= 1000
                 read_speeds.append(speed)
         except Exception as e:
-            print(f"{Colors.FAIL}dd read test failed: {e}{Colors.ENDC}")
+            print(c(Colors.FAIL, f"dd read test failed: {e}"))
     try:
         os.remove(test_filename)
     except Exception:
         pass
-    avg_write = sum(write_speeds)/len(write_speeds) if write_speeds else 0
-    avg_read = sum(read_speeds)/len(read_speeds) if read_speeds else 0
+    avg_write = fmean(write_speeds) if write_speeds else 0.0
+    avg_read = fmean(read_speeds) if read_speeds else 0.0
     return avg_write, avg_read
 
-def run_disk_test(disk_folder, fio_cmd="fio"):
+@functools.lru_cache(maxsize=1)
+def _which_fio():
+    return shutil.which('fio')
+
+def run_disk_test(disk_folder, fio_cmd):
     disk_dir = disk_folder
-    if shutil.which(fio_cmd) is None:
-        print(f"{Colors.WARNING}Fio is not installed. Skipping additional disk test.{Colors.ENDC}")
+    if fio_cmd is None:
+        print(c(Colors.WARNING, "Fio is not installed. Skipping additional disk test."))
         return
     st = shutil.disk_usage(disk_folder)
     avail_kb = st.free // 1024
     arch = platform.machine().lower()
     if (("arm" in arch or arch in ["aarch64", "arm"]) and avail_kb < 524288) or (avail_kb < 2097152):
-        print(f"{Colors.WARNING}\nNot enough free space available. Skipping additional disk test.{Colors.ENDC}")
+        print(c(Colors.WARNING, "\nNot enough free space available. Skipping additional disk test."))
         return
     fio_size = "512M" if ("arm" in arch or arch in ["aarch64", "arm"]) else "2G"
     test_file = os.path.join(disk_dir, "test.fio")
@@ -286,36 +630,31 @@ def run_disk_test(disk_folder, fio_cmd="fio"):
         "--ioengine=libaio",
         "--rw=read",
         "--bs=64k",
-        "--iodepth=64",
-        "--numjobs=2",
         f"--size={fio_size}",
-        "--runtime=1",
-        "--gtod_reduce=1",
+        "--create_only=1",
+        "--fallocate=native",
         f"--filename={test_file}",
         "--direct=1",
         "--minimal"
     ]
     try:
-        subprocess.run(setup_cmd, capture_output=True, text=True, check=True, timeout=15)
-        print(f"{Colors.OKBLUE}Fio test file generated.{Colors.ENDC}")
+        subprocess.run(setup_cmd, stdout=_NULL_FD, stderr=_NULL_FD, check=True, timeout=15)
+        print(c(Colors.OKBLUE, "Fio test file generated."))
     except Exception as e:
-        print(f"{Colors.WARNING}Error generating fio test file: {e}. Skipping additional disk test.{Colors.ENDC}")
+        print(c(Colors.WARNING, f"Error generating fio test file: {e}. Skipping additional disk test."))
         return
     block_sizes = ["4k", "64k", "512k", "1m"]
-    fio_results = []
-    for bs in block_sizes:
-        print(f"{Colors.OKBLUE}Running fio test with block size {bs}...{Colors.ENDC}")
-        res = run_fio_test_for_bs(bs, fio_size, test_file, fio_cmd)
-        if res:
-            res["read_bw_fmt"] = format_speed(res["read_bw"])
-            res["write_bw_fmt"] = format_speed(res["write_bw"])
-            res["total_bw_fmt"] = format_speed(res["total_bw"])
-            res["read_iops_fmt"] = format_iops(res["read_iops"])
-            res["write_iops_fmt"] = format_iops(res["write_iops"])
-            res["total_iops_fmt"] = format_iops(res["total_iops"])
-            fio_results.append(res)
+    print(c(Colors.OKBLUE, f"Running fio test with block sizes {', '.join(block_sizes)}..."))
+    fio_results = run_fio_tests(block_sizes, fio_size, test_file, fio_cmd)
+    for res in fio_results:
+        res["read_bw_fmt"] = format_speed(res["read_bw"])
+        res["write_bw_fmt"] = format_speed(res["write_bw"])
+        res["total_bw_fmt"] = format_speed(res["total_bw"])
+        res["read_iops_fmt"] = format_iops(res["read_iops"])
+        res["write_iops_fmt"] = format_iops(res["write_iops"])
+        res["total_iops_fmt"] = format_iops(res["total_iops"])
     if fio_results:
-        print(f"\n{Colors.HEADER}Fio Disk Speed Tests:{Colors.ENDC}")
+        print(c(Colors.HEADER, "\nFio Disk Speed Tests:"))
         print("-" * 60)
         for res in fio_results:
             print(f"Block Size: {res['bs']}")
@@ -324,21 +663,23 @@ def run_disk_test(disk_folder, fio_cmd="fio"):
             print(f"  Total : {res['total_bw_fmt']} ({res['total_iops_fmt']} IOPS)")
             print("-" * 60)
     else:
-        print(f"{Colors.WARNING}No results from fio test. Skipping additional disk test.{Colors.ENDC}")
+        print(c(Colors.WARNING, "No results from fio test. Skipping additional disk test."))
 
 def main():
     parser = argparse.ArgumentParser(description="HDDBench: Simultaneous file write/read test tool")
     parser.add_argument('--config', type=str, default='config.yaml', help="Path to YAML configuration file (default: config.yaml)")
     parser.add_argument('--run-as-root', action='store_true', help="Allow running as root")
+    parser.add_argument('--drop-caches', action='store_true', help="Drop the page cache before each run (requires root)")
+    parser.add_argument('--legacy-dd', action='store_true', help="Write test files with dd instead of native writes")
     args = parser.parse_args()
     if os.geteuid() == 0 and not args.run_as_root:
-        print(f"{Colors.WARNING}Warning: This script should not be run as root. Use --run-as-root to run as root.{Colors.ENDC}")
+        print(c(Colors.WARNING, "Warning: This script should not be run as root. Use --run-as-root to run as root."))
         exit(1)
     try:
         with open(args.config, 'r') as f:
             config = yaml.safe_load(f)
     except Exception as e:
-        print(f"{Colors.FAIL}Error loading configuration file: {e}{Colors.ENDC}")
+        print(c(Colors.FAIL, f"Error loading configuration file: {e}"))
         return
     try:
         hdd_config = config['HDDTest']
@@ -350,17 +691,20 @@ def main():
         test_path = hdd_config['test_path']
         debug = bool(hdd_config.get('debug', False))
         fio_test_enabled = bool(hdd_config.get('fio_test', True))
+        max_parallel_io = hdd_config.get('max_parallel_io')
+        max_parallel_io = int(max_parallel_io) if max_parallel_io else None
+        pin_cpus = bool(hdd_config.get('pin_cpus', False))
     except Exception as e:
-        print(f"{Colors.FAIL}Error reading configuration: {e}{Colors.ENDC}")
+        print(c(Colors.FAIL, f"Error reading configuration: {e}"))
         return
     valid_syncmodes = ['none', 'direct', 'dsync', 'sync']
     if syncmode not in valid_syncmodes:
-        print(f"{Colors.FAIL}Invalid syncmode: {syncmode}. Using 'none'.{Colors.ENDC}")
+        print(c(Colors.FAIL, f"Invalid syncmode: {syncmode}. Using 'none'."))
         syncmode = 'none'
     try:
         bytes_per_file = parse_size(size_str)
     except ValueError as e:
-        print(f"{Colors.FAIL}Error: {e}{Colors.ENDC}")
+        print(c(Colors.FAIL, f"Error: {e}"))
         return
     disk_test_folder = os.path.join(test_path, "Disk_Test")
     os.makedirs(disk_test_folder, exist_ok=True)
@@ -374,24 +718,38 @@ def main():
     total_files_successful = 0
     total_data_written = 0
     total_error_count = 0
-    for run in range(1, runs + 1):
-        run_dir = os.path.join(base_test_dir, f"run_{run}")
-        res = run_test_run(run, files, size_str, run_dir, syncmode, bytes_per_file, debug)
-        run_results.append(res)
-        all_run_durations.append(res['duration'])
-        all_overall_speeds.append(res['overall_speed'])
-        all_file_speeds.append(res['avg_file_speed'])
-        total_files_successful += res['files_successful']
-        total_data_written += res['data_written_bytes']
-        total_error_count += res['error_count']
-        if not keep:
-            try:
-                shutil.rmtree(run_dir)
-            except Exception as e:
-                print(f"{Colors.FAIL}Error deleting {run_dir}: {e}{Colors.ENDC}")
-    avg_duration = sum(all_run_durations) / len(all_run_durations) if all_run_durations else 0
-    avg_overall_speed = sum(all_overall_speeds) / len(all_overall_speeds) if all_overall_speeds else 0
-    avg_file_speed = sum(all_file_speeds) / len(all_file_speeds) if all_file_speeds else 0
+    workers = min(files, max_parallel_io or _detect_optimal_concurrency(disk_test_folder))
+    use_io_uring = not args.legacy_dd and _io_uring_usable()
+    drop_page_cache = args.drop_caches and os.geteuid() == 0
+    if args.drop_caches and not drop_page_cache:
+        print(c(Colors.WARNING, "--drop-caches requires root. Page cache will not be dropped between runs."))
+    if pin_cpus and use_io_uring:
+        print(c(Colors.WARNING, "pin_cpus only applies to threaded writes and is ignored on the io_uring path."))
+    if pin_cpus:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, initializer=_pin_worker,
+                                                         initargs=(sorted(os.sched_getaffinity(0)),))
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        for run in range(1, runs + 1):
+            run_dir = os.path.join(base_test_dir, f"run_{run}")
+            drop_caches(drop_page_cache)
+            res = run_test_run(run, files, size_str, run_dir, syncmode, bytes_per_file, debug, executor, workers, args.legacy_dd, use_io_uring)
+            run_results.append(res)
+            all_run_durations.append(res['duration'])
+            all_overall_speeds.append(res['overall_speed'])
+            all_file_speeds.append(res['avg_file_speed'])
+            total_files_successful += res['files_successful']
+            total_data_written += res['data_written_bytes']
+            total_error_count += res['error_count']
+            if not keep:
+                try:
+                    shutil.rmtree(run_dir)
+                except Exception as e:
+                    print(c(Colors.FAIL, f"Error deleting {run_dir}: {e}"))
+    avg_duration = fmean(all_run_durations) if all_run_durations else 0.0
+    avg_overall_speed = fmean(all_overall_speeds) if all_overall_speeds else 0.0
+    avg_file_speed = fmean(all_file_speeds) if all_file_speeds else 0.0
     overall_stats = {
         'avg_duration': avg_duration,
         'avg_overall_speed': avg_overall_speed,
@@ -406,16 +764,16 @@ def main():
     }
     print_summary_table(run_results, overall_stats)
     if fio_test_enabled:
-        print(f"\n{Colors.OKCYAN}Starting additional disk test...{Colors.ENDC}")
-        run_disk_test(disk_test_folder)
+        print(c(Colors.OKCYAN, "\nStarting additional disk test..."))
+        run_disk_test(disk_test_folder, _which_fio())
     else:
-        print(f"{Colors.WARNING}Additional disk test (fio) is disabled in the configuration.{Colors.ENDC}")
+        print(c(Colors.WARNING, "Additional disk test (fio) is disabled in the configuration."))
     if not keep:
         try:
             shutil.rmtree(disk_test_folder)
-            print(f"{Colors.OKGREEN}Disk Test folder '{disk_test_folder}' has been deleted.{Colors.ENDC}")
+            print(c(Colors.OKGREEN, f"Disk Test folder '{disk_test_folder}' has been deleted."))
         except Exception as e:
-            print(f"{Colors.FAIL}Error deleting Disk Test folder '{disk_test_folder}': {e}{Colors.ENDC}")
+            print(c(Colors.FAIL, f"Error deleting Disk Test folder '{disk_test_folder}': {e}"))
 
 if __name__ == '__main__':
     main()